@@ -1,23 +1,70 @@
 from base64 import b64encode
 from dataclasses import InitVar, dataclass, field, fields
-from io import BytesIO
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, ClassVar, Dict, List, Optional, Tuple, Type, TypeVar, Union, get_args, overload
+from typing import (
+    Any,
+    Callable,
+    ClassVar,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Protocol,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    get_args,
+    overload,
+)
 from typing_extensions import override
 
 from .parser import Element as RawElement
-from .parser import escape, param_case
+from .parser import escape, format_attr
 from .parser import select as select_raw
 
 TE = TypeVar("TE", bound="Element")
 
 
+class SupportsGetValue(Protocol):
+    def getvalue(self) -> bytes: ...
+
+
+_FIELDS_CACHE: Dict[type, Tuple[Tuple[str, Any], ...]] = {}
+
+
+def _field_types(cls: type) -> Tuple[Tuple[str, Any], ...]:
+    if cls not in _FIELDS_CACHE:
+        _FIELDS_CACHE[cls] = tuple(
+            (f.name, get_args(f.type)[0] if hasattr(f.type, "__origin__") else f.type)
+            for f in fields(cls)
+            if f.name not in ("_attrs", "_children")
+        )
+    return _FIELDS_CACHE[cls]
+
+
+@lru_cache(maxsize=512)
+def _path_to_uri(path: str) -> str:
+    return Path(path).as_uri()
+
+
 @dataclass(repr=False)
 class Element:
     _attrs: Dict[str, Any] = field(init=False, default_factory=dict)
     _children: List["Element"] = field(init=False, default_factory=list)
 
     __names__: ClassVar[Tuple[str, ...]]
+    __tag__: ClassVar[str] = "element"
+    __tag_fixed__: ClassVar[bool] = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # a tag set in the class body is kept, and inherited by subclasses, like the old tag overrides
+        if "__tag__" in cls.__dict__:
+            cls.__tag_fixed__ = True
+        elif not cls.__tag_fixed__:
+            cls.__tag__ = cls.__name__.lower()
 
     @property
     def children(self) -> List["Element"]:
@@ -25,59 +72,70 @@ class Element:
 
     @property
     def tag(self) -> str:
-        return self.__class__.__name__.lower()
+        return self.__tag__
 
     @classmethod
     def unpack(cls, attrs: Dict[str, Any]):
-        obj = cls(**{k: v for k, v in attrs.items() if k in cls.__names__})  # type: ignore
-        obj._attrs.update({k: v for k, v in attrs.items() if k not in cls.__names__})
+        names = cls.__names__
+        known: Dict[str, Any] = {}
+        extra: Dict[str, Any] = {}
+        for k, v in attrs.items():
+            (known if k in names else extra)[k] = v
+        obj = cls(**known)  # type: ignore
+        obj._attrs.update(extra)
         return obj
 
     def __post_init__(self):
-        for f in fields(self):
-            if f.name in ("_attrs", "_children"):
-                continue
-            _type = get_args(f.type)[0] if hasattr(f.type, "__origin__") else f.type
-            if _type is not str and isinstance(attr := getattr(self, f.name), str):
+        for name, _type in _field_types(self.__class__):
+            if _type is not str and isinstance(attr := getattr(self, name), str):
                 if _type is bool:
                     if attr.lower() not in ("true", "false"):
-                        raise TypeError(f.name, attr)
-                    setattr(self, f.name, attr.lower() == "true")
+                        raise TypeError(name, attr)
+                    setattr(self, name, attr.lower() == "true")
                 else:
-                    setattr(self, f.name, _type(attr))
-            self._attrs[f.name] = getattr(self, f.name)
-        self._attrs = {k: v for k, v in self._attrs.items() if v is not None}
+                    setattr(self, name, _type(attr))
+            if (value := getattr(self, name)) is not None:
+                self._attrs[name] = value
 
     def attributes(self) -> str:
-        def _attr(key: str, value: Any):
-            if value is None:
-                return ""
-            key = param_case(key)
-            if value is True:
-                return f" {key}"
-            if value is False:
-                return f" no-{key}"
-            return f' {key}="{escape(str(value), True)}"'
-
-        return "".join(_attr(k, v) for k, v in self._attrs.items())
+        return "".join([format_attr(k, v) for k, v in self._attrs.items()])
 
-    def dumps(self, strip: bool = False) -> str:
-        if self.tag == "text" and "text" in self._attrs:
-            return self._attrs["text"] if strip else escape(self._attrs["text"])
-        inner = "".join(c.dumps(strip) for c in self._children)
+    def write(self, out: List[str], strip: bool = False) -> None:
+        """将元素序列化后的片段追加到 out 中。
+
+        子类可以重写 write 或 dumps 来自定义序列化结果；重写了 dumps 的子元素会通过其 dumps 渲染。
+        """
+        tag = self.tag
+        if tag == "text" and "text" in self._attrs:
+            out.append(self._attrs["text"] if strip else escape(self._attrs["text"]))
+            return
         if strip:
-            return inner
-        attrs = self.attributes()
+            self._write_children(out, strip)
+            return
         if not self._children:
-            return f"<{self.tag}{attrs}/>"
-        return f"<{self.tag}{attrs}>{inner}</{self.tag}>"
+            out.append(f"<{tag}{self.attributes()}/>")
+            return
+        out.append(f"<{tag}{self.attributes()}>")
+        self._write_children(out, strip)
+        out.append(f"</{tag}>")
+
+    def _write_children(self, out: List[str], strip: bool) -> None:
+        for child in self._children:
+            if type(child).dumps is Element.dumps:
+                child.write(out, strip)
+            else:
+                out.append(child.dumps(strip))
+
+    def dumps(self, strip: bool = False) -> str:
+        out: List[str] = []
+        self.write(out, strip)
+        return "".join(out)
 
     def __str__(self) -> str:
         return self.dumps()
 
     def __repr__(self) -> str:
-        args = {**self._attrs}
-        elem = f"{self.__class__.__name__}(" + ", ".join(f"{k}={v!r}" for k, v in args.items())
+        elem = f"{self.__class__.__name__}(" + ", ".join(f"{k}={v!r}" for k, v in self._attrs.items())
         if self._children:
             elem += ", { " + ", ".join(repr(i) for i in self._children) + " }"
         return elem + ")"
@@ -100,8 +158,8 @@ class Text(Element):
     text: str
 
     @override
-    def dumps(self, strip: bool = False) -> str:
-        return self.text if strip else escape(self.text)
+    def write(self, out: List[str], strip: bool = False) -> None:
+        out.append(self.text if strip else escape(self.text))
 
     __names__ = ("text",)
 
@@ -144,6 +202,7 @@ class Link(Element):
     href: str
 
     __names__ = ("href",)
+    __tag__ = "a"
 
     def __post_call__(self):
         if not self._children:
@@ -152,11 +211,6 @@ class Link(Element):
             return
         raise ValueError("Link can only have one Text child")
 
-    @property
-    @override
-    def tag(self) -> str:
-        return "a"
-
     @property
     def url(self) -> str:
         return self.href
@@ -177,7 +231,7 @@ class Resource(Element):
         cls,
         url: Optional[str] = None,
         path: Optional[Union[str, Path]] = None,
-        raw: Optional[Union[bytes, BytesIO]] = None,
+        raw: Optional[Union[bytes, bytearray, memoryview, SupportsGetValue]] = None,
         mime: Optional[str] = None,
         name: Optional[str] = None,
         poster: Optional[str] = None,
@@ -186,16 +240,19 @@ class Resource(Element):
         timeout: Optional[int] = None,
         **kwargs,
     ):
-        data: Dict[str, Any] = {"extra": extra}
         if url is not None:
-            data = {"src": url}
+            src = url
         elif path:
-            data = {"src": Path(path).as_uri()}
+            src = _path_to_uri(str(path))
         elif raw and mime:
-            bd = raw.getvalue() if isinstance(raw, BytesIO) else raw
-            data = {"src": f"data:{mime};base64,{b64encode(bd).decode('utf-8')}"}
+            # buffers exposing getvalue() (BytesIO and the like) are read through it, bytes-like data as is
+            bd: bytes = raw.getvalue() if hasattr(raw, "getvalue") else raw  # type: ignore
+            src = f"data:{mime};base64,{b64encode(bd).decode('ascii')}"
         else:
             raise ValueError(f"{cls} need at least one of url, path and raw")
+        data: Dict[str, Any] = {"src": src}
+        if extra:
+            data["extra"] = extra
         if name is not None:
             data["title"] = name
         if poster is not None and cls in (Video, Audio, File):
@@ -221,10 +278,7 @@ class Image(Resource):
 
     __names__ = ("src", "title", "width", "height")
 
-    @property
-    @override
-    def tag(self) -> str:
-        return "img"
+    __tag__ = "img"
 
 
 @dataclass(repr=False)
@@ -272,73 +326,49 @@ class Style(Element):
 class Bold(Style):
     """<b> 或 <strong> 元素用于将其中的内容以粗体显示。"""
 
-    @property
-    @override
-    def tag(self) -> str:
-        return "b"
+    __tag__ = "b"
 
 
 class Italic(Style):
     """<i> 或 <em> 元素用于将其中的内容以斜体显示。"""
 
-    @property
-    @override
-    def tag(self) -> str:
-        return "i"
+    __tag__ = "i"
 
 
 class Underline(Style):
     """<u> 或 <ins> 元素用于为其中的内容附加下划线。"""
 
-    @property
-    @override
-    def tag(self) -> str:
-        return "u"
+    __tag__ = "u"
 
 
 class Strikethrough(Style):
     """<s> 或 <del> 元素用于为其中的内容附加删除线。"""
 
-    @property
-    @override
-    def tag(self) -> str:
-        return "s"
+    __tag__ = "s"
 
 
 class Spoiler(Style):
     """<spl> 元素用于将其中的内容标记为剧透 (默认会被隐藏，点击后才显示)。"""
 
-    @property
-    @override
-    def tag(self) -> str:
-        return "spl"
+    __tag__ = "spl"
 
 
 class Code(Style):
     """<code> 元素用于将其中的内容以等宽字体显示 (通常还会有特定的背景色)。"""
 
-    @property
-    @override
-    def tag(self) -> str:
-        return "code"
+    __tag__ = "code"
 
 
 class Superscript(Style):
     """<sup> 元素用于将其中的内容以上标显示。"""
 
-    @property
-    @override
-    def tag(self) -> str:
-        return "sup"
+    __tag__ = "sup"
 
 
 class Subscript(Style):
     """<sub> 元素用于将其中的内容以下标显示。"""
 
-    @property
-    @override
-    def tag(self) -> str:
-        return "sub"
+    __tag__ = "sub"
 
 
 class Br(Style):
@@ -349,19 +379,13 @@ class Br(Style):
         if self._children:
             raise ValueError("Br cannot have children")
 
-    @property
-    @override
-    def tag(self) -> str:
-        return "br"
+    __tag__ = "br"
 
 
 class Paragraph(Style):
     """<p> 元素表示一个段落。在渲染时，它与相邻的元素之间会确保有一个换行。"""
 
-    @property
-    @override
-    def tag(self) -> str:
-        return "p"
+    __tag__ = "p"
 
 
 @dataclass(init=False, repr=False)
@@ -493,8 +517,8 @@ class Raw(Element):
     __names__ = ()
 
     @override
-    def dumps(self, strip: bool = False):
-        return self.content if strip else escape(self.content)
+    def write(self, out: List[str], strip: bool = False) -> None:
+        out.append(self.content if strip else escape(self.content))
 
 
 ELEMENT_TYPE_MAP = {
@@ -536,34 +560,38 @@ STYLE_TYPE_MAP = {
 }
 
 
+_UNPACKERS: Dict[str, Callable[[Dict[str, Any]], Element]] = {
+    **{tag: cls.unpack for tag, cls in ELEMENT_TYPE_MAP.items()},
+    "a": Link.unpack,
+    "link": Link.unpack,
+    "button": Button.unpack,
+    **{tag: cls.unpack for tag, cls in STYLE_TYPE_MAP.items()},
+    "newline": lambda attrs: Br(),
+    "message": Message.unpack,
+    "quote": Quote.unpack,
+}
+
+
 def transform(elements: List[RawElement]) -> List[Element]:
-    msg = []
-    for elem in elements:
-        tag = elem.tag()
-        if tag in ELEMENT_TYPE_MAP:
-            seg_cls = ELEMENT_TYPE_MAP[tag]
-            msg.append(seg_cls.unpack(elem.attrs)(*transform(elem.children)))
-        elif tag in ("a", "link"):
-            link = Link.unpack(elem.attrs)
-            if elem.children:
-                link(*transform(elem.children))
-            msg.append(link)
-        elif tag == "button":
-            button = Button.unpack(elem.attrs)
-            if elem.children:
-                button(*transform(elem.children))
-            msg.append(button)
-        elif tag in STYLE_TYPE_MAP:
-            seg_cls = STYLE_TYPE_MAP[tag]
-            msg.append(seg_cls.unpack(elem.attrs)(*transform(elem.children)))
-        elif tag in ("br", "newline"):
-            msg.append(Br())
-        elif tag == "message":
-            msg.append(Message.unpack(elem.attrs)(*transform(elem.children)))
-        elif tag == "quote":
-            msg.append(Quote.unpack(elem.attrs)(*transform(elem.children)))
+    msg: List[Element] = []
+    # explicit stack instead of recursion: (pending raw elements, output, on_complete)
+    stack: List[Tuple[Iterator[RawElement], List[Element], Optional[Callable[..., Any]]]] = [
+        (iter(elements), msg, None)
+    ]
+    while stack:
+        elems, out, on_complete = stack[-1]
+        for elem in elems:
+            tag = elem.tag()
+            unpack = _UNPACKERS.get(tag)
+            seg = unpack(elem.attrs) if unpack else Custom(elem.type, elem.attrs)
+            out.append(seg)
+            if elem.children and tag != "newline":
+                stack.append((iter(elem.children), [], seg.__call__))
+                break
         else:
-            msg.append(Custom(elem.type, elem.attrs)(*transform(elem.children)))
+            stack.pop()
+            if on_complete is not None:
+                on_complete(*out)
     return msg
 
 
@@ -585,11 +613,16 @@ def select(elements: Union[Element, List[Element]], query: Union[Type[TE], str])
     if query is Element:
         return elements
     results = []
-    for elem in elements:
-        if isinstance(elem, query):
-            results.append(elem)
-        if elem.children:
-            results.extend(select(elem.children, query))
+    stack: List[Iterator[Element]] = [iter(elements)]
+    while stack:
+        for elem in stack[-1]:
+            if isinstance(elem, query):
+                results.append(elem)
+            if elem.children:
+                stack.append(iter(elem.children))
+                break
+        else:
+            stack.pop()
     return results
 
 
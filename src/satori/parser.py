@@ -43,6 +43,24 @@ def ensure_list(value: Union[T, List[T], None]) -> List[T]:
     return value if isinstance(value, list) else [value] if value else []
 
 
+def _format_default(key: str, value: Any, _escape=escape) -> str:
+    return f' {key}="{_escape(str(value), True)}"'
+
+
+_ATTR_FORMATTERS: Dict[type, Callable[[str, Any], str]] = {
+    bool: lambda key, value: f" {key}" if value else f" no-{key}",
+    int: lambda key, value: f' {key}="{value}"',
+    float: lambda key, value: f' {key}="{value}"',
+    str: lambda key, value, _escape=escape: f' {key}="{_escape(value, True)}"',
+}
+
+
+def format_attr(key: str, value: Any) -> str:
+    if value is None:
+        return ""
+    return _ATTR_FORMATTERS.get(type(value), _format_default)(param_case(key), value)
+
+
 S = TypeVar("S")
 Fragment: TypeAlias = Union[str, "Element", List[Union[str, "Element"]]]
 Render: TypeAlias = Callable[[dict, List["Element"], S], T]
@@ -111,22 +129,12 @@ class Element:
         return self.type
 
     def attributes(self) -> str:
-        def _attr(key: str, value: Any):
-            if value is None:
-                return ""
-            key = param_case(key)
-            if value is True:
-                return f" {key}"
-            if value is False:
-                return f" no-{key}"
-            return f' {key}="{escape(str(value), True)}"'
-
-        return "".join(_attr(k, v) for k, v in self.attrs.items())
+        return "".join([format_attr(k, v) for k, v in self.attrs.items()])
 
     def dumps(self, strip: bool = False) -> str:
         if self.type == "text" and "text" in self.attrs:
             return self.attrs["text"] if strip else escape(self.attrs["text"])
-        inner = "".join(c.dumps(strip) for c in self.children)
+        inner = "".join([c.dumps(strip) for c in self.children])
         if strip:
             return inner
         attrs = self.attributes()